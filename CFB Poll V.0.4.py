@@ -2,110 +2,237 @@ import requests
 import math
 import csv
 import json
+import pickle
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import requests_cache
+    # Historical seasons never change, so cache CFBD responses on disk and
+    # only re-download after expiry. 404s are cached too (missing seasons).
+    _session = requests_cache.CachedSession(
+        "cfbd_cache",
+        backend="sqlite",
+        expire_after=timedelta(days=30),
+        allowable_codes=(200, 404),
+    )
+except ImportError:
+    # No cache available; a plain Session still pools connections so repeat
+    # calls reuse one TCP+TLS handshake instead of reconnecting every fetch.
+    _session = requests.Session()
 
 # -------------------------
 # Glicko-2 with Margin-of-Victory
 # -------------------------
-class Glicko2Player:
-    def __init__(self, rating=1500, rd=350, sigma=0.06):
-        self.rating = rating
-        self.rd = rd
-        self.sigma = sigma
+_Q = math.log(10) / 400
+_SCALE = 173.7178
+_G_COEF = (3 * _Q**2) / (math.pi**2)  # constant factor inside g(phi)
+_LOG1P = np.log(np.arange(256) + 1.0)  # log(margin+1) table; margins are small ints
+
+
+def _update_week_loops(ratings, rd, sigma, pi, oi, score, margin):
+    """
+    Scalar-loop Glicko-2 week update, mutating ratings/rd in place.
+
+    Written as plain loops over typed arrays so Numba can lower it to native
+    floating-point code; update_week() falls back to the NumPy path when
+    Numba is not installed.
+    """
+    n = ratings.shape[0]
+    v_inv = np.zeros(n)
+    delta_sum = np.zeros(n)
+
+    # Ratings are frozen for the rating period, so mu/phi/g are computed once
+    # per team up front instead of once per game appearance.
+    mu_all = (ratings - 1500.0) / _SCALE
+    phi_all = rd / _SCALE
+    g_all = 1.0 / np.sqrt(1.0 + _G_COEF * phi_all * phi_all)
+
+    for k in range(pi.shape[0]):
+        i = pi[k]
+        j = oi[k]
+        g = g_all[j]
+        # logistic via tanh: 1/(1+exp(-x)) == 0.5*(1+tanh(x/2))
+        E = 0.5 * (1.0 + math.tanh(0.5 * g * (mu_all[i] - mu_all[j])))
+        rating_diff = abs(ratings[i] - ratings[j])
+        m = margin[k]
+        log_m = _LOG1P[m] if m < 256 else math.log(m + 1.0)
+        mov = log_m * (2.2 / (rating_diff * 0.001 + 2.2))
+
+        v_inv[i] += g * g * E * (1.0 - E)
+        delta_sum[i] += mov * g * (score[k] - E)
+
+    for i in range(n):
+        if v_inv[i] > 0.0:
+            mu = mu_all[i]
+            phi = phi_all[i]
+            v = 1.0 / v_inv[i]
+            phi_star = math.sqrt(phi * phi + sigma[i] * sigma[i])
+            phi_new = 1.0 / math.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+            mu_new = mu + phi_new * phi_new * delta_sum[i]
+            ratings[i] = 1500.0 + _SCALE * mu_new
+            rd[i] = _SCALE * phi_new
+
+
+if njit is not None:
+    _update_week_loops = njit(cache=True, fastmath=True)(_update_week_loops)
 
-    def __str__(self):
-        return f"R={self.rating:.1f}, RD={self.rd:.1f}, σ={self.sigma:.3f}"
 
 
 class Glicko2System:
+    """
+    Glicko-2 rating system stored as Structure-of-Arrays.
+
+    Teams are mapped to integer ids via `team_id`, and rating state lives in
+    three parallel NumPy arrays (`ratings`, `rd`, `sigma`) indexed by id, so a
+    whole week of games can be updated with vectorized array math instead of
+    per-game Python loops.
+    """
     TAU = 0.5
     BASE_RATING = 1500
     BASE_RD = 350
     BASE_SIGMA = 0.06
+    SCALE = 173.7178
     q = math.log(10) / 400
+    FCS_TEAM = "FCS"
+    FCS_RATING = 1400
 
     def __init__(self):
-        self.players = {}
+        self.team_id = {}
+        self.id_to_team = []
+        self.ratings = np.empty(0, dtype=np.float64)
+        self.rd = np.empty(0, dtype=np.float64)
+        self.sigma = np.empty(0, dtype=np.float64)
+        # One shared pseudo-opponent stands in for every FCS team. It only
+        # ever appears on the opponent side of a game, so it is never updated.
+        self.init_team(self.FCS_TEAM, self.FCS_RATING)
+        self.fcs_id = self.team_id[self.FCS_TEAM]
 
     def init_team(self, team, base_rating=1500):
-        if team not in self.players:
-            self.players[team] = Glicko2Player(rating=base_rating)
-
-    def _g(self, phi):
-        return 1 / math.sqrt(1 + (3 * self.q**2 * phi**2) / (math.pi**2))
-
-    def _E(self, mu, mu_j, phi_j):
-        return 1 / (1 + math.exp(-self._g(phi_j) * (mu - mu_j)))
-
-    def _mov_multiplier(self, margin, rating_diff):
-        """Margin-of-victory factor."""
-        return math.log(margin + 1) * (2.2 / (rating_diff * 0.001 + 2.2))
+        if team not in self.team_id:
+            self.team_id[team] = len(self.id_to_team)
+            self.id_to_team.append(team)
+            self.ratings = np.append(self.ratings, float(base_rating))
+            self.rd = np.append(self.rd, float(self.BASE_RD))
+            self.sigma = np.append(self.sigma, self.BASE_SIGMA)
+
+    def init_teams(self, base_ratings):
+        """
+        Bulk-register teams from a {team: starting rating} dict, growing the
+        arrays once instead of re-allocating per team. Already-known teams
+        are left untouched.
+        """
+        new = [(team, r) for team, r in base_ratings.items() if team not in self.team_id]
+        if not new:
+            return
+        for team, _ in new:
+            self.team_id[team] = len(self.id_to_team)
+            self.id_to_team.append(team)
+        n = len(new)
+        self.ratings = np.concatenate((
+            self.ratings,
+            np.fromiter((r for _, r in new), dtype=np.float64, count=n),
+        ))
+        self.rd = np.concatenate((self.rd, np.full(n, float(self.BASE_RD))))
+        self.sigma = np.concatenate((self.sigma, np.full(n, self.BASE_SIGMA)))
+
+    def update_week(self, pi, oi, score, margin):
+        """
+        Apply one rating period worth of games in a single vectorized pass.
+
+        `pi`/`oi` are arrays of player/opponent team ids (one row per side of
+        each game), `score` is 1/0.5/0 from the player's perspective, and
+        `margin` is the points margin. Opponent ratings are frozen at their
+        start-of-week values, per standard Glicko-2 batch semantics.
+        """
+        pi = np.asarray(pi)
+        if pi.size == 0:
+            return
+        oi = np.asarray(oi)
+        score = np.asarray(score, dtype=np.float64)
+        margin = np.asarray(margin)
 
-    def update_player(self, player, results):
-        if not results:
+        if njit is not None:
+            # JIT-compiled scalar loop; first call pays the compile cost once
+            _update_week_loops(self.ratings, self.rd, self.sigma, pi, oi, score, margin)
             return
 
-        mu = (player.rating - self.BASE_RATING) / 173.7178
-        phi = player.rd / 173.7178
-
-        v_inv = 0
-        delta_sum = 0
-        for opp, score, margin in results:
-            mu_j = (opp.rating - self.BASE_RATING) / 173.7178
-            phi_j = opp.rd / 173.7178
-            E = self._E(mu, mu_j, phi_j)
-            g = self._g(phi_j)
-            rating_diff = abs(player.rating - opp.rating)
-            mov_factor = self._mov_multiplier(margin, rating_diff)
-
-            v_inv += (g**2) * E * (1 - E)
-            delta_sum += mov_factor * g * (score - E)
-
-        v = 1 / v_inv
-        phi_star = math.sqrt(phi**2 + player.sigma**2)
-        phi_new = 1 / math.sqrt((1 / (phi_star**2)) + (1 / v))
-        mu_new = mu + phi_new**2 * delta_sum
-
-        player.rating = self.BASE_RATING + 173.7178 * mu_new
-        player.rd = 173.7178 * phi_new
-
-    def update_match(self, team_a, team_b, score_a, score_b):
-        margin = abs(score_a - score_b)
-        if score_a > score_b:
-            result_a, result_b = 1, 0
-        elif score_a < score_b:
-            result_a, result_b = 0, 1
+        # Per-team mu/phi/g once for the week, then gathered per game row
+        mu = (self.ratings - self.BASE_RATING) / self.SCALE
+        phi = self.rd / self.SCALE
+        g_all = 1 / np.sqrt(1 + _G_COEF * phi**2)
+
+        g = g_all[oi]
+        # logistic via tanh: 1/(1+exp(-x)) == 0.5*(1+tanh(x/2))
+        E = 0.5 * (1 + np.tanh(0.5 * g * (mu[pi] - mu[oi])))
+        rating_diff = np.abs(self.ratings[pi] - self.ratings[oi])
+        if margin.max() < _LOG1P.size:
+            log_m = _LOG1P[margin]
         else:
-            result_a = result_b = 0.5
-            margin = 1
+            log_m = np.log(margin + 1)
+        mov = log_m * (2.2 / (rating_diff * 0.001 + 2.2))
+
+        n = self.ratings.shape[0]
+        v_inv = np.zeros(n)
+        delta_sum = np.zeros(n)
+        np.add.at(v_inv, pi, g * g * E * (1 - E))
+        np.add.at(delta_sum, pi, mov * g * (score - E))
+
+        played = v_inv > 0
+        v = 1 / v_inv[played]
+        phi_star = np.sqrt(phi[played]**2 + self.sigma[played]**2)
+        phi_new = 1 / np.sqrt((1 / (phi_star**2)) + (1 / v))
+        mu_new = mu[played] + phi_new**2 * delta_sum[played]
 
-        self.update_player(self.players[team_a], [(self.players[team_b], result_a, margin)])
-        self.update_player(self.players[team_b], [(self.players[team_a], result_b, margin)])
+        self.ratings[played] = self.BASE_RATING + self.SCALE * mu_new
+        self.rd[played] = self.SCALE * phi_new
 
     def get_ratings(self):
-        return {team: p.rating for team, p in self.players.items()}
+        return {team: self.ratings[i] for team, i in self.team_id.items()}
 
 
 # -------------------------
 # CFBD Data Fetch
 # -------------------------
+def _parse_json(resp):
+    # orjson parses straight from the response bytes, ~3x faster than the
+    # stdlib on a full-season payload
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
 def fetch_all_games(api_key, season):
     """
     Fetch all games for a season in one API call.
     """
     url = f"https://api.collegefootballdata.com/games?year={season}"
     headers = {"Authorization": f"Bearer {api_key}"}
-    resp = requests.get(url, headers=headers)
+    resp = _session.get(url, headers=headers)
     if resp.status_code == 404:
         return []
     resp.raise_for_status()
-    return resp.json()
+    return _parse_json(resp)
 
+@lru_cache(maxsize=1)
 def fetch_conferences(api_key):
     url = "https://api.collegefootballdata.com/teams/fbs"
     headers = {"Authorization": f"Bearer {api_key}"}
-    resp = requests.get(url, headers=headers)
+    resp = _session.get(url, headers=headers)
     resp.raise_for_status()
-    teams = resp.json()
+    teams = _parse_json(resp)
     return {team['school']: team['conference'] for team in teams}
 
 
@@ -116,9 +243,11 @@ def export_weekly_rankings_csv(weekly_rankings, filepath="weekly_rankings.csv"):
     with open(filepath, "w", newline="") as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(["Week", "Rank", "Team", "Rating"])
-        for week, rankings in weekly_rankings.items():
-            for rank, (team, rating) in enumerate(rankings, start=1):
-                writer.writerow([week, rank, team, f"{rating:.1f}"])
+        writer.writerows(
+            (week, rank, team, f"{rating:.1f}")
+            for week, rankings in weekly_rankings.items()
+            for rank, (team, rating) in enumerate(rankings, start=1)
+        )
     print(f"Weekly rankings exported to {filepath}")
 
 def export_weekly_rankings_json(weekly_rankings, filepath="weekly_rankings.json"):
@@ -127,99 +256,160 @@ def export_weekly_rankings_json(weekly_rankings, filepath="weekly_rankings.json"
                for i, (team, rating) in enumerate(rankings)]
         for week, rankings in weekly_rankings.items()
     }
-    with open(filepath, "w") as jsonfile:
-        json.dump(json_data, jsonfile, indent=2)
+    if orjson is not None:
+        with open(filepath, "wb") as jsonfile:
+            jsonfile.write(orjson.dumps(
+                json_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(filepath, "w") as jsonfile:
+            json.dump(json_data, jsonfile, indent=2)
     print(f"Weekly rankings exported to {filepath}")
 
 
+# -------------------------
+# Game Parsing
+# -------------------------
+def bucket_games_by_week(games, team_id, fcs_id):
+    """
+    Bucket a season's games by week in a single pass, resolving team names to
+    integer ids as we go. One team_id lookup doubles as the FBS membership
+    test (only FBS teams are registered); non-FBS sides map to the shared FCS
+    pseudo-team id. Games with no FBS side are dropped here.
+    Returns {week: [(a_id, b_id, sA, sB, is_A_fbs, is_B_fbs)]}.
+    """
+    by_week = defaultdict(list)
+    for gm in games:
+        week = gm.get('week')
+        if week is None:
+            continue
+
+        tA = gm.get('homeTeam') or gm.get('home_team')
+        tB = gm.get('awayTeam') or gm.get('away_team')
+        sA = gm.get('homePoints', 0) or 0
+        sB = gm.get('awayPoints', 0) or 0
+
+        a = team_id.get(tA)
+        b = team_id.get(tB)
+        if a is None and b is None:
+            continue
+        by_week[week].append((
+            fcs_id if a is None else a,
+            fcs_id if b is None else b,
+            sA, sB, a is not None, b is not None,
+        ))
+    return by_week
+
+
+def build_week_batch(week_games):
+    """
+    Turn one week's pre-parsed game tuples into update_week arrays with
+    vectorized integer math: margins from one np.abs, results from np.sign,
+    no per-game branching. Only FBS sides get a batch row, so the FCS
+    pseudo-team appears as an opponent but is never updated.
+    """
+    a, b, sA, sB, a_fbs, b_fbs = (np.array(col) for col in zip(*week_games))
+    diff = sA.astype(np.int32) - sB.astype(np.int32)
+    margin = np.abs(diff)
+    margin[margin == 0] = 1  # ties count with margin 1, as before
+    result_a = 0.5 * (np.sign(diff) + 1)
+
+    pi = np.concatenate((a[a_fbs], b[b_fbs]))
+    oi = np.concatenate((b[a_fbs], a[b_fbs]))
+    score = np.concatenate((result_a[a_fbs], 1 - result_a[b_fbs]))
+    margin = np.concatenate((margin[a_fbs], margin[b_fbs]))
+    return pi, oi, score, margin
+
+
 # -------------------------
 # Historical Warm-up
 # -------------------------
 def run_historical(api_key, start_year, end_year, base_elos, conf_map, FBS_TEAMS):
     system = Glicko2System()
 
-    # Initialize all FBS teams
-    for team, conf in conf_map.items():
-        system.init_team(team, base_elos.get(conf, 1500))
+    # Initialize all FBS teams in one pass: resolve each conference's base
+    # rating once and bulk-load the result into the rating arrays
+    system.init_teams({team: base_elos.get(conf, 1500) for team, conf in conf_map.items()})
+
+    # Season downloads are independent, so fetch them all concurrently and
+    # consume the results in chronological order for the rating updates.
+    years = range(start_year, end_year + 1)
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        futures = {year: ex.submit(fetch_all_games, api_key, year) for year in years}
 
-    for year in range(start_year, end_year + 1):
+    for year in years:
         print(f"Processing season {year}...")
-        games = fetch_all_games(api_key, year)
+        games = futures[year].result()
         if not games:
             continue
 
-        weeks = sorted({gm['week'] for gm in games if 'week' in gm})
-        for week in weeks:
-            week_games = [gm for gm in games if gm.get('week') == week]
-            for gm in week_games:
-                tA = gm.get('homeTeam') or gm.get('home_team')
-                tB = gm.get('awayTeam') or gm.get('away_team')
-                sA = gm.get('homePoints', 0) or 0
-                sB = gm.get('awayPoints', 0) or 0
-
-                is_A_fbs = tA in FBS_TEAMS
-                is_B_fbs = tB in FBS_TEAMS
-
-                if is_A_fbs and is_B_fbs:
-                    system.update_match(tA, tB, sA, sB)
-                elif is_A_fbs or is_B_fbs:
-                    # FBS vs. FCS game
-                    fbs_team = tA if is_A_fbs else tB
-                    fbs_score = sA if is_A_fbs else sB
-                    fcs_score = sB if is_A_fbs else sA
-
-                    temp_fcs_player = Glicko2Player(rating=1400)
-                    result = 1 if fbs_score > fcs_score else (0 if fbs_score < fcs_score else 0.5)
-                    margin = abs(fbs_score - fcs_score) or 1
-                    system.update_player(system.players[fbs_team], [(temp_fcs_player, result, margin)])
-
-        print(f"Finished processing {year} with {len(system.players)} FBS teams rated.")
+        by_week = bucket_games_by_week(games, system.team_id, system.fcs_id)
+        for week in sorted(by_week):
+            system.update_week(*build_week_batch(by_week[week]))
+
+        print(f"Finished processing {year} with {len(FBS_TEAMS)} FBS teams rated.")
 
     return system
 
 
+# -------------------------
+# Warm-up Persistence
+# -------------------------
+def save_warmup(system, filepath):
+    state = {team: (system.ratings[i], system.rd[i], system.sigma[i])
+             for team, i in system.team_id.items()}
+    with open(filepath, "wb") as f:
+        pickle.dump(state, f)
+    print(f"Warm-up ratings saved to {filepath}")
+
+def load_warmup(filepath):
+    """
+    Rebuild a warmed-up Glicko2System from a saved state file so repeat runs
+    skip the multi-season historical replay. Returns None if no file exists.
+    """
+    try:
+        with open(filepath, "rb") as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+    system = Glicko2System()
+    system.init_teams({team: rating for team, (rating, _, _) in state.items()})
+    for team, (_, rd, sigma) in state.items():
+        i = system.team_id[team]
+        system.rd[i] = rd
+        system.sigma[i] = sigma
+    print(f"Loaded warm-up ratings from {filepath}")
+    return system
+
+
 # -------------------------
 # Current Season Rankings
 # -------------------------
-def run_current_season(api_key, season, max_week, system, base_elos, FBS_TEAMS):
+def run_current_season(api_key, season, max_week, system, base_elos, top_n=None):
     games = fetch_all_games(api_key, season)
     if not games:
         return {}
 
-    weeks = sorted({gm['week'] for gm in games if 'week' in gm})
+    by_week = bucket_games_by_week(games, system.team_id, system.fcs_id)
     weekly_rankings = {}
 
-    for week in weeks:
+    for week in sorted(by_week):
         if week > max_week:
             break
 
-        week_games = [gm for gm in games if gm.get('week') == week]
-        for gm in week_games:
-            tA = gm.get('homeTeam') or gm.get('home_team')
-            tB = gm.get('awayTeam') or gm.get('away_team')
-            sA = gm.get('homePoints', 0) or 0
-            sB = gm.get('awayPoints', 0) or 0
-
-            is_A_fbs = tA in FBS_TEAMS
-            is_B_fbs = tB in FBS_TEAMS
-
-            if is_A_fbs and is_B_fbs:
-                system.update_match(tA, tB, sA, sB)
-            elif is_A_fbs or is_B_fbs:
-                fbs_team = tA if is_A_fbs else tB
-                fbs_score = sA if is_A_fbs else sB
-                fcs_score = sB if is_A_fbs else sA
-
-                temp_fcs_player = Glicko2Player(rating=1400)
-                result = 1 if fbs_score > fcs_score else (0 if fbs_score < fcs_score else 0.5)
-                margin = abs(fbs_score - fcs_score) or 1
-                system.update_player(system.players[fbs_team], [(temp_fcs_player, result, margin)])
-
-        weekly_rankings[week] = sorted(
-            [(team, rating) for team, rating in system.get_ratings().items() if team in FBS_TEAMS],
-            key=lambda x: x[1],
-            reverse=True
-        )
+        system.update_week(*build_week_batch(by_week[week]))
+
+        # Rank straight off the rating array; every rated team is FBS except
+        # the FCS pseudo-team, which is dropped below.
+        ratings = system.ratings
+        if top_n is not None and top_n + 1 < ratings.size:
+            # partial selection, top_n + 1 in case the FCS slot makes the cut
+            cut = np.argpartition(-ratings, top_n)[:top_n + 1]
+            order = cut[np.argsort(-ratings[cut])]
+        else:
+            order = np.argsort(-ratings)
+        ranked = [(system.id_to_team[i], float(ratings[i])) for i in order if i != system.fcs_id]
+        weekly_rankings[week] = ranked[:top_n] if top_n is not None else ranked
 
     return weekly_rankings
 
@@ -245,15 +435,20 @@ if __name__ == "__main__":
 
     # Fetch conference map once
     conf_map = fetch_conferences(API_KEY)
-    FBS_TEAMS = set(conf_map.keys())
+    FBS_TEAMS = frozenset(conf_map)
 
-    # 1. Warm up ratings using historical data (2015–2024)
-    glicko_system = run_historical(API_KEY, 2015, 2024, BASE_ELOS, conf_map, FBS_TEAMS)
+    # 1. Warm up ratings using historical data (2015–2024), reusing a saved
+    #    warm-up from a previous run when one exists
+    warmup_file = "warmup_2015_2024.pkl"
+    glicko_system = load_warmup(warmup_file)
+    if glicko_system is None:
+        glicko_system = run_historical(API_KEY, 2015, 2024, BASE_ELOS, conf_map, FBS_TEAMS)
+        save_warmup(glicko_system, warmup_file)
 
     # 2. Run rankings for 2025
     season = 2025
     max_week = 7  # Adjust as needed
-    weekly = run_current_season(API_KEY, season, max_week, glicko_system, BASE_ELOS, FBS_TEAMS)
+    weekly = run_current_season(API_KEY, season, max_week, glicko_system, BASE_ELOS)
 
     # Print full rankings per week
     for w, rankings in weekly.items():